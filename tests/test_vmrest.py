@@ -1,38 +1,265 @@
+import base64
+import io
+import os
+import tempfile
 import unittest
 import requests
 import json
 from unittest.mock import patch, MagicMock, Mock
-from vmrest import get_all_vms, power_on_off, display_vms
+import vmrest
+from vmrest import get_all_vms, power_on_off, display_vms, get_vm_name_by_ids, get_vm_info
 from vmware_server import *
 
+_cache_dir = None
+
+
+def setUpModule():
+    # Keep the on-disk listing cache out of the real home directory.
+    global _cache_dir
+    _cache_dir = tempfile.TemporaryDirectory()
+    vmrest.DISK_CACHE_DIR = _cache_dir.name
+
+
+def tearDownModule():
+    _cache_dir.cleanup()
+
+
 class TestVMRest(unittest.TestCase):
-    @patch("requests.get")
+    @patch("vmrest.SESSION.get")
     def test_get_all_vms_success(self, mock_get):
-        mock_response = Mock()
-        mock_response.return_value.json.return_value = [{"id": "vm1", "path": "/path/to/vm1"}]
-        mock_response.side_effect = requests.exceptions.ConnectionError("Connection failed")
-        mock_response.return_value.status_code = 200
-
-        mock_get = mock_response
+        get_all_vms.cache_clear()
+        mock_get.return_value.content = b'[{"id": "vm1", "path": "/path/to/vm1"}]'
+        mock_get.return_value.status_code = 200
 
         vms = get_all_vms()
 
-    @patch("requests.put")
+        self.assertEqual(vms, [{"id": "vm1", "path": "/path/to/vm1"}])
+        mock_get.assert_called_once_with(vmrest._VMS_URL, timeout=vmrest.REQUEST_TIMEOUT)
+        get_all_vms.cache_clear()
+
+    @patch("vmrest.SESSION.get", side_effect=requests.exceptions.ConnectionError("Connection failed"))
+    def test_get_all_vms_connection_error(self, mock_get):
+        get_all_vms.cache_clear()
+        with patch("builtins.print"):
+            self.assertEqual(get_all_vms(), [])
+
+    @patch("vmrest.SESSION.put")
     @patch("vmrest.get_vm_power_state", return_value="poweredOff")
-    def test_power_on_off_success(self, mock_power_state, mock_put):
-        mock_put.return_value.json.return_value = {"power_state": "poweredOn"}
+    @patch("vmrest._uncached_get_all_vms")
+    def test_power_on_off_success(self, mock_uncached, mock_power_state, mock_put):
+        get_all_vms.cache_clear()
+        mock_put.return_value.content = b'{"power_state": "poweredOn"}'
         mock_put.return_value.status_code = 200
-        self.assertIsNone(power_on_off("vm1", "on"))
+        with patch("builtins.print") as mock_print:
+            self.assertIsNone(power_on_off("vm1", "on"))
+            mock_print.assert_called_once_with("VM vm1 is now poweredOn.")
         mock_put.assert_called_once()
+        mock_power_state.assert_not_called()
+        # Without a listing at hand only the ID is shown; the VM list is not fetched for a label.
+        mock_uncached.assert_not_called()
 
-    @patch("vmrest.get_vm_name_by_ids", return_value="TestVM")
     @patch("vmrest.get_vm_power_state", return_value="poweredOn")
-    def test_display_vms(self, mock_power_state, mock_name):
-        vms = [{"id": "vm1", "path": "/path/to/vm1"}]
-        with patch("builtins.print") as mock_print:
+    @patch("vmrest.get_vm_ip", return_value="10.0.0.5")
+    @patch("vmrest.get_vm_mac", return_value=[(0, "00:0c:29:aa:bb:cc")])
+    @patch("vmrest.get_vm_setting", return_value=(2, 4096))
+    def test_display_vms(self, mock_setting, mock_mac, mock_ip, mock_power_state):
+        vms = [{"id": "vm1", "path": "/path/to/test-vm.vmx"}]
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
             display_vms(vms)
-            mock_print.assert_any_call("\n1. VM Name: TestVM")
-            mock_print.assert_any_call("   Power State: poweredOn")
+        output = mock_stdout.getvalue()
+        self.assertIn("\n1. VM Name: Test vm\n", output)
+        self.assertIn("   Power State: poweredOn\n", output)
+        self.assertIn("   MAC Address (NIC 0): 00:0c:29:aa:bb:cc\n", output)
+
+    @patch("vmrest.get_vm_info")
+    @patch("vmrest._get_vm_param", side_effect=lambda vm_id, param: None if param == "workingDir" else f"{param}-value")
+    @patch("vmrest.get_vm_power_state", return_value="poweredOff")
+    def test_display_vms_all_info_uses_one_pool(self, mock_power_state, mock_param, mock_info):
+        vms = [{"id": "vm1", "path": "/path/to/vm1.vmx"}]
+        with patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            display_vms(vms, show_all_info=True)
+        mock_info.assert_not_called()
+        self.assertEqual(mock_param.call_count, 4)
+        self.assertIn("   Guestos : guestOS-value\n", mock_stdout.getvalue())
+        self.assertNotIn("Workingdir", mock_stdout.getvalue())
+
+    @patch("vmrest.SESSION.put")
+    @patch("vmrest.get_vm_power_state")
+    def test_power_on_off_uses_listed_power_state(self, mock_power_state, mock_put):
+        vms = [{"id": "vm1", "path": "/path/to/vm1.vmx", "power_state": "poweredOn"}]
+        with patch("builtins.print") as mock_print:
+            self.assertFalse(power_on_off("vm1", "on", vms=vms))
+            mock_print.assert_called_once_with("VM Vm1 vm1 is Already Powered On!")
+        mock_power_state.assert_not_called()
+        mock_put.assert_not_called()
+
+    @patch("vmrest.SESSION.put")
+    @patch("vmrest.get_vm_power_state", return_value="poweredOff")
+    def test_power_on_off_rejected_when_already_off(self, mock_power_state, mock_put):
+        mock_put.return_value.raise_for_status.side_effect = requests.exceptions.HTTPError("409 Conflict")
+        vmrest._vm_cache["paths"] = {"vm1": "/path/to/test-vm.vmx"}
+        with patch("builtins.print") as mock_print:
+            self.assertFalse(power_on_off("vm1", "off"))
+            mock_print.assert_called_once_with("VM Test vm vm1 is Already Powered Off!")
+        get_all_vms.cache_clear()
+        mock_power_state.assert_called_once_with("vm1")
+
+    @patch("vmrest.get_all_vms")
+    def test_get_vm_name_by_ids_uses_preloaded_vms(self, mock_get_all_vms):
+        vms = [{"id": "vm1", "path": "C:\\VMs\\test-vm\\test-vm.vmx"}]
+        self.assertEqual(get_vm_name_by_ids("vm1", vms=vms), "Test vm")
+        mock_get_all_vms.assert_not_called()
+
+    @patch("vmrest.SESSION.get")
+    def test_get_vm_info(self, mock_get):
+        mock_get.return_value.content = b'{"value": "windows9-64"}'
+        mock_get.return_value.status_code = 200
+        info = get_vm_info("vm1")
+        self.assertEqual(list(info), ["guestOS", "displayName", "workingDir", "guestInfo.detailed.data"])
+        self.assertEqual(info["guestOS"], "windows9-64")
+        self.assertEqual(mock_get.call_count, 4)
+
+    @patch("vmrest._uncached_get_all_vms", return_value=[{"id": "vm1", "path": "/path/to/test-vm.vmx"}])
+    def test_get_vm_name_by_ids_uses_cached_index(self, mock_uncached):
+        get_all_vms.cache_clear()
+        self.assertEqual(get_vm_name_by_ids("vm1"), "Test vm")
+        self.assertIsNone(get_vm_name_by_ids("vm2"))
+        mock_uncached.assert_called_once()
+        get_all_vms.cache_clear()
+
+    @patch("vmrest._uncached_get_all_vms", return_value=[{"id": "vm1", "path": "/path/to/vm1"}])
+    def test_get_all_vms_is_cached(self, mock_uncached):
+        get_all_vms.cache_clear()
+        self.assertEqual(get_all_vms(), get_all_vms())
+        mock_uncached.assert_called_once()
+        get_all_vms.cache_clear()
+        get_all_vms()
+        self.assertEqual(mock_uncached.call_count, 2)
+        get_all_vms.cache_clear()
+
+    @patch("vmrest._uncached_get_all_vms", return_value=[{"id": "vm1", "path": "/vms/vm1.vmx"}])
+    def test_get_all_vms_reuses_disk_cache(self, mock_uncached):
+        get_all_vms.cache_clear()
+        get_all_vms()
+        # A new run starts with an empty in-memory cache but finds the listing on disk.
+        vmrest._vm_cache.clear()
+        self.assertEqual(get_all_vms(), [{"id": "vm1", "path": "/vms/vm1.vmx"}])
+        mock_uncached.assert_called_once()
+
+        get_all_vms.cache_clear()
+        self.assertFalse(os.path.exists(vmrest._disk_cache_path("vms")))
+        get_all_vms()
+        self.assertEqual(mock_uncached.call_count, 2)
+        get_all_vms.cache_clear()
+
+    @patch("vmrest._uncached_get_all_networks", return_value=[{"name": "vmnet1"}])
+    def test_get_all_networks_is_cached(self, mock_uncached):
+        vmrest.get_all_networks.cache_clear()
+        self.assertEqual(vmrest.get_all_networks(), vmrest.get_all_networks())
+        mock_uncached.assert_called_once()
+        vmrest._clear_caches()
+        vmrest.get_all_networks()
+        self.assertEqual(mock_uncached.call_count, 2)
+        vmrest.get_all_networks.cache_clear()
+
+    @unittest.skipIf(vmrest.tomllib is None, "tomllib requires Python 3.11+")
+    def test_configure_writes_parseable_toml(self):
+        answers = ["", "alice", 'p\u00e4ss "\\ \U0001F600\x7f\tx', ""]
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                patch("vmrest.CONFIG_FILE", os.path.join(tmp_dir, "vmworkstation.toml")), \
+                patch("vmrest._reload_settings"), patch("builtins.input", side_effect=answers), \
+                patch("builtins.print"):
+            vmrest.configure_vmworkstation_ini()
+            settings = vmrest.load_settings()
+        vmrest.load_settings.cache_clear()
+        self.assertEqual(settings["username"], "alice")
+        self.assertEqual(settings["password"], answers[2])
+
+    @unittest.skipIf(vmrest.tomllib is None, "tomllib requires Python 3.11+")
+    def test_load_settings_survives_invalid_toml(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config_file = os.path.join(tmp_dir, "vmworkstation.toml")
+            with open(config_file, "w") as f:
+                f.write('[vmware]\npassword = "\\ud83d"\n')
+            with patch("vmrest.CONFIG_FILE", config_file), \
+                    patch("vmrest.LEGACY_CONFIG_FILE", os.path.join(tmp_dir, "missing.ini")), \
+                    patch("builtins.print") as mock_print:
+                vmrest.load_settings.cache_clear()
+                self.assertEqual(vmrest.load_settings(), {})
+        vmrest.load_settings.cache_clear()
+        mock_print.assert_called_once()
+
+    @unittest.skipIf(vmrest.tomllib is None, "tomllib requires Python 3.11+")
+    def test_load_settings_survives_unreadable_toml(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                patch("vmrest.CONFIG_FILE", tmp_dir), \
+                patch("vmrest.LEGACY_CONFIG_FILE", os.path.join(tmp_dir, "missing.ini")), \
+                patch("builtins.print") as mock_print:
+            # Opening a directory raises an OSError other than FileNotFoundError, as an unreadable file does.
+            vmrest.load_settings.cache_clear()
+            self.assertEqual(vmrest.load_settings(), {})
+        vmrest.load_settings.cache_clear()
+        mock_print.assert_called_once()
+
+    def test_start_server_or_exit_reports_launch_failure(self):
+        server = MagicMock()
+        server.start_server.side_effect = VMRestStartError("Server executable not found: vmrest.exe.")
+        with patch("builtins.print") as mock_print, self.assertRaises(SystemExit) as exit_info:
+            vmrest._start_server_or_exit(server)
+        self.assertEqual(exit_info.exception.code, 1)
+        mock_print.assert_called_once_with("Error: Server executable not found: vmrest.exe.")
+
+    @patch("vmrest.configure_vmworkstation_ini")
+    @patch("vmware_server.VMWareServer")
+    def test_main_closes_server_on_exit(self, mock_server_class, mock_configure):
+        with patch("sys.argv", ["vmrest.py", "--configure"]), self.assertRaises(SystemExit):
+            vmrest.main()
+        mock_configure.assert_called_once()
+        mock_server_class.return_value.close.assert_called_once()
+
+    @patch("vmrest._clear_caches")
+    def test_menu_start_server_reports_launch_failure(self, mock_clear):
+        server = MagicMock()
+        server.start_server.side_effect = VMRestStartError("Server executable not found: vmrest.exe.")
+        with patch("builtins.print") as mock_print:
+            vmrest._menu_start_server(server)
+        mock_print.assert_called_once_with("Error: Server executable not found: vmrest.exe.")
+        mock_clear.assert_called_once()
+
+    @patch("vmrest._clear_caches")
+    @patch("vmrest.power_on_off")
+    @patch("vmrest.show_all_vm_ids", return_value=[{"id": "vm1", "power_state": "poweredOff"}])
+    def test_menu_dispatches_choice(self, mock_show_ids, mock_power_on_off, mock_clear):
+        server = MagicMock()
+        with patch("builtins.input", side_effect=["3", "vm1", "7", "x", "q"]), \
+                patch("sys.stdout", new_callable=io.StringIO) as mock_stdout:
+            vmrest.menu(server)
+        mock_power_on_off.assert_called_once_with("vm1", "on", vms=mock_show_ids.return_value)
+        server.stop_server.assert_called_once_with()
+        self.assertIn("Invalid choice, please try again.", mock_stdout.getvalue())
+        self.assertIn("Exiting program.", mock_stdout.getvalue())
+
+    @patch("vmrest.load_settings", return_value={"base_url": "http://10.0.0.2:8697", "username": "alice", "password": "secret"})
+    def test_reload_settings_rebuilds_endpoints_and_header(self, mock_load):
+        old_auth = vmrest.SESSION.auth
+        self.addCleanup(setattr, vmrest.SESSION, "auth", old_auth)
+        for name in ("BASE_URL", "USERNAME", "PASSWORD", "VMWARE_REST_EXE", "_VMS_URL", "_NETS_URL"):
+            self.addCleanup(setattr, vmrest, name, getattr(vmrest, name))
+        with patch.dict("os.environ", {}, clear=True):
+            vmrest._reload_settings()
+        self.assertEqual(vmrest.SESSION.auth.header, "Basic " + base64.b64encode(b"alice:secret").decode("ascii"))
+        self.assertEqual(vmrest._VMS_URL, "http://10.0.0.2:8697/api/vms")
+        self.assertEqual(vmrest._NETS_URL, "http://10.0.0.2:8697/api/vmnet")
+
+    @patch("vmrest.load_settings")
+    def test_setting_prefers_environment(self, mock_load):
+        with patch.dict("os.environ", {"VMREST_BASE_URL": "http://example:8697"}):
+            self.assertEqual(vmrest._setting("VMREST_BASE_URL", "base_url", "x"), "http://example:8697")
+        mock_load.assert_not_called()
+
+        mock_load.return_value = {"base_url": "http://config:8697"}
+        with patch.dict("os.environ", {}, clear=True):
+            self.assertEqual(vmrest._setting("VMREST_BASE_URL", "base_url", "x"), "http://config:8697")
 
 if __name__ == "__main__":
     unittest.main()
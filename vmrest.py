@@ -4,37 +4,191 @@ VMware REST API Module
 This module provides a set of functions for interacting with the VMware REST server.
 """
 
-import configparser
-import argparse
+import base64
+import functools
+import json
+import os
 import sys
+import tempfile
 import time
-import platform
-import debugpy
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 import requests
-from requests.auth import HTTPBasicAuth
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase
+from urllib3.util.retry import Retry
 
-from vmware_server import VMWareServer
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    tomllib = None
 
-# debugpy.breakpoint()
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:  # orjson is optional
+    _loads = json.loads
 
 # Constants for default values
 DEFAULT_BASE_URL = "http://127.0.0.1:8697"
 
-if platform.system() == "Windows":
+_IS_WINDOWS = sys.platform == "win32"
+
+if _IS_WINDOWS:
     DEFAULT_VMREST_EXE = r"C:\Program Files (x86)\VMware\VMware Workstation\vmrest.exe"
 else:
     DEFAULT_VMREST_EXE = r"/mnt/c/Program Files (x86)/VMware/VMware Workstation/vmrest.exe"
 
-# Load settings from vmworkstation.ini
-config = configparser.ConfigParser()
-config.read("vmworkstation.ini")
+CONFIG_FILE = "vmworkstation.toml"
+LEGACY_CONFIG_FILE = "vmworkstation.ini"
+
+
+@functools.cache
+def load_settings() -> dict:
+    """
+    Load the [vmware] settings from vmworkstation.toml.
 
-# Set defaults if not provided in the ini file.
-BASE_URL = config.get("vmware", "base_url", fallback=DEFAULT_BASE_URL)
-USERNAME = config.get("vmware", "username", fallback="")
-PASSWORD = config.get("vmware", "password", fallback="")
-VMWARE_REST_EXE = config.get("vmware", "vmrest_exe", fallback=DEFAULT_VMREST_EXE)
+    Falls back to the legacy vmworkstation.ini when the TOML file does not exist, cannot be read or parsed,
+    or tomllib is unavailable (Python < 3.11). The result is cached, and nothing is read at all when every setting comes from the environment.
+
+    Returns:
+        dict: The settings found, or an empty dict if neither file exists.
+    """
+    if tomllib is not None:
+        try:
+            with open(CONFIG_FILE, "rb") as config_file:
+                return tomllib.load(config_file).get("vmware", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, tomllib.TOMLDecodeError, UnicodeDecodeError) as e:
+            print(f"Error reading {CONFIG_FILE}: {e}")
+
+    if not os.path.exists(LEGACY_CONFIG_FILE):
+        return {}
+
+    import configparser
+
+    config = configparser.ConfigParser()
+    config.read(LEGACY_CONFIG_FILE)
+    return dict(config["vmware"]) if config.has_section("vmware") else {}
+
+
+def _setting(env_var, key, default):
+    """
+    Look up a setting, preferring the environment over the config file.
+
+    Args:
+        env_var (str): Environment variable overriding the setting.
+        key (str): Key of the setting in the [vmware] section.
+        default (str): Value used when neither source provides one.
+
+    Returns:
+        str: The setting's value.
+    """
+    return os.environ.get(env_var) or load_settings().get(key, default)
+
+
+# Environment variables take precedence; the config file is only read for the ones not set.
+BASE_URL = _setting("VMREST_BASE_URL", "base_url", DEFAULT_BASE_URL)
+USERNAME = _setting("VMREST_USER", "username", "")
+PASSWORD = _setting("VMREST_PASS", "password", "")
+VMWARE_REST_EXE = _setting("VMREST_EXE", "vmrest_exe", DEFAULT_VMREST_EXE)
+
+# Endpoints and headers shared by every REST call.
+_VMS_URL = f"{BASE_URL}/api/vms"
+_NETS_URL = f"{BASE_URL}/api/vmnet"
+_ACCEPT_HEADERS = {"Accept": "application/vnd.vmware.vmw.rest-v1+json"}
+# Only the Content-Type needs adding per request; the session already sends Accept.
+_JSON_HEADERS = {"Content-Type": _ACCEPT_HEADERS["Accept"]}
+
+# The REST server runs locally, so a short timeout is plenty.
+REQUEST_TIMEOUT = 10
+
+# Maximum number of REST requests display_vms runs concurrently. The session
+# keeps the same number of connections so every worker can reuse one.
+MAX_WORKERS = 16
+
+# Longest config param value printed by display_vms.
+MAX_OUTPUT_LENGTH = 120
+
+# Config params get_vm_info retrieves.
+_VM_INFO_PARAMS = ("guestOS", "displayName", "workingDir", "guestInfo.detailed.data")
+
+# Power state each power_on_off action leads to.
+_TARGET_POWER_STATES = {"on": "poweredOn", "off": "poweredOff"}
+
+# Seconds a get_all_vms() result is reused, and the cache holding it as (timestamp, vms)
+# along with an id -> path index of the same list.
+VM_CACHE_TTL = 5.0
+_vm_cache = {}
+
+# Networks rarely change while the tool runs, so their list is kept longer.
+NET_CACHE_TTL = 30.0
+_net_cache = {}
+
+# The same listings are also kept on disk, so back-to-back CLI runs within the TTL skip the request.
+DISK_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "vmrest")
+
+
+class _PrecomputedBasicAuth(AuthBase):
+    """
+    HTTP Basic auth whose Authorization header is encoded once instead of on every request.
+    """
+
+    def __init__(self, username, password):
+        credentials = f"{username}:{password}"
+        try:
+            # Same encoding requests' HTTPBasicAuth uses.
+            credentials = credentials.encode("latin1")
+        except UnicodeEncodeError:
+            credentials = credentials.encode("utf-8")
+        self.header = "Basic " + base64.b64encode(credentials).decode("ascii")
+
+    def __call__(self, request):
+        request.headers["Authorization"] = self.header
+        return request
+
+
+# Shared session so every REST call reuses the same keep-alive connection,
+# credentials and Accept header.
+SESSION = requests.Session()
+SESSION.auth = _PrecomputedBasicAuth(USERNAME, PASSWORD)
+SESSION.headers.update(_ACCEPT_HEADERS)
+# Transient gateway/unavailable responses (e.g. while vmrest is still starting) are retried
+# with a short backoff. A refused connection is only retried once so a stopped server is
+# reported quickly.
+_RETRY = Retry(
+    total=3,
+    connect=1,
+    backoff_factor=0.2,
+    status_forcelist=(502, 503, 504),
+    allowed_methods=frozenset({"GET", "PUT"}),
+)
+
+# pool_block makes extra concurrent requests wait for a pooled connection instead of
+# opening (and then discarding) additional sockets.
+_ADAPTER = HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=MAX_WORKERS,
+    pool_block=True,
+    max_retries=_RETRY,
+)
+SESSION.mount("http://", _ADAPTER)
+SESSION.mount("https://", _ADAPTER)
+
+
+def _reload_settings():
+    """
+    Re-reads the settings, rebuilding the REST endpoints and the session's precomputed Authorization header.
+    """
+    global BASE_URL, USERNAME, PASSWORD, VMWARE_REST_EXE, _VMS_URL, _NETS_URL
+    BASE_URL = _setting("VMREST_BASE_URL", "base_url", DEFAULT_BASE_URL)
+    _VMS_URL = f"{BASE_URL}/api/vms"
+    _NETS_URL = f"{BASE_URL}/api/vmnet"
+    VMWARE_REST_EXE = _setting("VMREST_EXE", "vmrest_exe", DEFAULT_VMREST_EXE)
+    USERNAME = _setting("VMREST_USER", "username", "")
+    PASSWORD = _setting("VMREST_PASS", "password", "")
+    SESSION.auth = _PrecomputedBasicAuth(USERNAME, PASSWORD)
 
 
 def display_title_bar() -> None:
@@ -42,125 +196,324 @@ def display_title_bar() -> None:
     Display the title bar for the VMware WorkStation Rest application.
     """
     title = "VMware WorkStation Rest"
-    print("=" * len(title))
-    print(title)
-    print("=" * len(title))
+    bar = "=" * len(title)
+    sys.stdout.write(f"{bar}\n{title}\n{bar}\n")
+
+
+def _toml_string(value):
+    """
+    Quotes a value as a TOML basic string.
+
+    Args:
+        value (str): The value to quote.
+
+    Returns:
+        str: The quoted value. Non-ASCII characters are kept as they are, control characters are escaped.
+    """
+    escaped = []
+    for char in value:
+        if char in ('"', "\\"):
+            escaped.append("\\" + char)
+        elif char < " " or char == "\x7f":
+            escaped.append(f"\\u{ord(char):04x}")
+        else:
+            escaped.append(char)
+    return '"' + "".join(escaped) + '"'
 
 
 def configure_vmworkstation_ini() -> None:
     """
-    Configure the vmworkstation.ini file with user input.
+    Configure the vmworkstation.toml file with user input.
+
+    Without tomllib (Python < 3.11) the settings could not be read back from TOML, so the legacy
+    vmworkstation.ini is written instead.
     """
-    print("Configure vmworkstation.ini file:")
-    config["vmware"] = {}
+    config_file_name = CONFIG_FILE if tomllib is not None else LEGACY_CONFIG_FILE
+    print(f"Configure {config_file_name} file:")
+    new_settings = {}
 
     base_url = input(f"Enter base URL (Enter for Default: {DEFAULT_BASE_URL}): ").strip() or DEFAULT_BASE_URL
-    config["vmware"]["base_url"] = base_url
+    new_settings["base_url"] = base_url
 
     username = input("Enter username: ").strip()
-    config["vmware"]["username"] = username
+    new_settings["username"] = username
 
     password = input("Enter password: ").strip()
-    config["vmware"]["password"] = password
+    new_settings["password"] = password
 
     vmrest_exe = input(f"Enter path to vmrest.exe (Enter for Default: {DEFAULT_VMREST_EXE}): ").strip() or DEFAULT_VMREST_EXE
-    config["vmware"]["vmrest_exe"] = vmrest_exe
+    new_settings["vmrest_exe"] = vmrest_exe
 
-    with open("vmworkstation.ini", "w") as configfile:
-        config.write(configfile)
-        print("Configuration saved to vmworkstation.ini")
+    with open(config_file_name, "w", encoding="utf-8") as configfile:
+        if tomllib is not None:
+            configfile.write("[vmware]\n")
+            for key, value in new_settings.items():
+                configfile.write(f"{key} = {_toml_string(value)}\n")
+        else:
+            import configparser
+
+            config = configparser.ConfigParser()
+            # load_settings reads the ini with interpolation, so a literal % has to be doubled.
+            config["vmware"] = {key: value.replace("%", "%%") for key, value in new_settings.items()}
+            config.write(configfile)
+        print(f"Configuration saved to {config_file_name}")
+    load_settings.cache_clear()
+    _reload_settings()
+    # The cached listings may belong to the previous server.
+    _clear_caches()
+
+
+def _json(response):
+    """
+    Decodes the JSON body of a REST response, using orjson when it is installed.
+
+    Args:
+        response (requests.Response): The response to decode.
+
+    Returns:
+        The decoded JSON body.
+
+    Raises:
+        requests.exceptions.InvalidJSONError: If the body is not valid JSON.
+    """
+    try:
+        return _loads(response.content)
+    except ValueError as e:
+        raise requests.exceptions.InvalidJSONError(str(e), response=response) from e
 
 
-def get_all_vms():
+def _uncached_get_all_vms():
     """
     Retrieves a list of all virtual machines available in the VMware REST server.
     
     Returns:
         dict: A dictionary containing information about each virtual machine, including its ID and name.
     """
-    headers = {"Accept": "application/vnd.vmware.vmw.rest-v1+json"}
     try:
-        response = requests.get(
-            BASE_URL + "/api/vms",
-            headers=headers,
-            auth=HTTPBasicAuth(USERNAME, PASSWORD),
-            timeout=60
-        )
+        response = SESSION.get(_VMS_URL, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
-        return response.json()
+        return _json(response)
     except requests.exceptions.RequestException as e:
         print(f"Error fetching VMs: {e}")
         return []
 
 
-def show_all_vm_ids():
+def _disk_cache_path(key):
     """
-    Displays a list of unique IDs for all virtual machines available in the VMware REST server.
-    
+    Returns the file a listing is saved to in DISK_CACHE_DIR.
+
+    Args:
+        key (str): Name of the listing, e.g. "vms".
+
     Returns:
-        str: A comma-separated list of virtual machine IDs.
+        str: The path of the listing's cache file.
+    """
+    return os.path.join(DISK_CACHE_DIR, f"{key}.json")
+
+
+def _read_disk_cache(key, ttl):
+    """
+    Reads a listing saved by _write_disk_cache.
+
+    Args:
+        key (str): Name of the listing, e.g. "vms".
+        ttl (float): Maximum age in seconds of the saved listing.
+
+    Returns:
+        tuple: (age in seconds, listing), or None if nothing usable was saved for BASE_URL within the TTL.
+    """
+    path = _disk_cache_path(key)
+    try:
+        age = time.time() - os.path.getmtime(path)
+        if not 0 <= age < ttl:
+            return None
+        with open(path, "rb") as cache_file:
+            cached = _loads(cache_file.read())
+        if cached["base_url"] == BASE_URL:
+            return age, cached["data"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def _write_disk_cache(key, data):
+    """
+    Saves a listing for _read_disk_cache, replacing the previous file atomically.
+
+    Args:
+        key (str): Name of the listing, e.g. "vms".
+        data (list): The listing to save.
+    """
+    try:
+        os.makedirs(DISK_CACHE_DIR, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", dir=DISK_CACHE_DIR, delete=False) as cache_file:
+            json.dump({"base_url": BASE_URL, "data": data}, cache_file)
+        os.replace(cache_file.name, _disk_cache_path(key))
+    except OSError:
+        pass
+
+
+def _remove_disk_cache(key):
+    """
+    Deletes a listing saved by _write_disk_cache, if there is one.
+
+    Args:
+        key (str): Name of the listing, e.g. "vms".
+    """
+    try:
+        os.remove(_disk_cache_path(key))
+    except OSError:
+        pass
+
+
+def get_all_vms(ttl=VM_CACHE_TTL):
+    """
+    Retrieves a list of all virtual machines, reusing the last result if it is younger than the TTL.
+
+    A result saved on disk by an earlier run is reused too while it is younger than the TTL. Failed or
+    empty results are not cached. Call get_all_vms.cache_clear() to force a fresh request.
+
+    Args:
+        ttl (float): Maximum age in seconds of a cached result. Defaults to VM_CACHE_TTL.
+
+    Returns:
+        dict: A dictionary containing information about each virtual machine, including its ID and name.
+    """
+    now = time.monotonic()
+    cached_at, vms = _vm_cache.get("vms", (0.0, None))
+    if vms is not None and now - cached_at < ttl:
+        return vms
+
+    saved = _read_disk_cache("vms", ttl)
+    if saved is not None:
+        age, vms = saved
+        cached_at = now - age
+    else:
+        vms = _uncached_get_all_vms()
+        cached_at = now
+        if vms:
+            _write_disk_cache("vms", vms)
+    if vms:
+        _vm_cache["vms"] = (cached_at, vms)
+        _vm_cache["paths"] = {vm.get("id"): vm.get("path") for vm in vms}
+    return vms
+
+
+def _clear_vm_cache():
+    """
+    Drops the cached VM list, both in memory and on disk. Exposed as get_all_vms.cache_clear().
+    """
+    _vm_cache.clear()
+    _remove_disk_cache("vms")
+
+
+get_all_vms.cache_clear = _clear_vm_cache
+
+
+def show_all_vm_ids(with_power_state=False):
+    """
+    Displays the name, path and ID of all virtual machines available in the VMware REST server.
+
+    Args:
+        with_power_state (bool): If True, the power state of every VM is fetched concurrently and listed too.
+
+    Returns:
+        list: The virtual machines. With with_power_state, each entry is a copy carrying a 'power_state' key.
     """
     vms = get_all_vms()
-    print()
+    if with_power_state:
+        power_states = get_power_states([vm.get("id") for vm in vms])
+        vms = [{**vm, "power_state": power_state} for vm, power_state in zip(vms, power_states)]
+
+    lines = [""]
     for vm in vms:
-        vm_name = get_vm_name_by_ids(vm.get("id"))
-        print(f"VM Name {vm_name} VM Path: {vm.get('path')}, VM ID: {vm.get('id')}")
+        vm_name = _vm_name_from_path(vm.get("path"))
+        line = f"VM Name {vm_name} VM Path: {vm.get('path')}, VM ID: {vm.get('id')}"
+        if with_power_state:
+            line += f", Power State: {vm['power_state']}"
+        lines.append(line)
+    sys.stdout.write("\n".join(lines) + "\n")
     return vms
 
 
-def get_vm_name_by_ids(vm_id):
+@functools.lru_cache(maxsize=512)
+def _vm_name_from_path(vm_path):
+    """
+    Builds a display name for a virtual machine from the path of its .vmx file.
+
+    Args:
+        vm_path (str): The path of the virtual machine's .vmx file.
+
+    Returns:
+        str: The display name of the virtual machine, or None if there is no path.
+    """
+    if not vm_path:
+        return None
+
+    # Extract the file name without building a Path object
+    vm_name = vm_path.replace("\\", "/").rsplit("/", 1)[-1]
+
+    # Remove the '.vmx' extension and the hyphens
+    if vm_name.endswith(".vmx"):
+        vm_name = vm_name[:-4]
+    return vm_name.replace("-", " ").capitalize()
+
+
+def get_vm_name_by_ids(vm_id, vms=None):
     """
     Retrieves the name of a specific virtual machine based on its ID.
 
     Args:
         vm_id (str): The ID of the virtual machine to retrieve its name for.
+        vms (list): An already fetched list of virtual machines. If None, the list is fetched from the server.
 
     Returns:
         str: The name of the virtual machine associated with the specified ID.
     """
-    vms = get_all_vms()
-    for vm in vms:
-        if vm.get("id") == vm_id:
-            # Extract the file name
-            vm_path = vm.get("path")
-            vm_path = vm_path.replace("\\", "/")
-            windows_path = Path(vm_path)
-            vm_name = windows_path.name
+    if vms is None:
+        # The cached index matches whatever get_all_vms() returned, so no list scan is needed.
+        vm_paths = _vm_cache.get("paths", {}) if get_all_vms() else {}
+    else:
+        vm_paths = {vm.get("id"): vm.get("path") for vm in vms}
+    return _vm_name_from_path(vm_paths.get(vm_id))
+
 
-            # Remove the hyphen and the '.vmx' extension
-            vm_name = vm_name.replace("-", " ").replace(".vmx", "").capitalize()
+def _get_vm_param(vm_id, param):
+    """
+    Retrieves the value of a single config param of a virtual machine.
+
+    Args:
+        vm_id (str): The ID of the virtual machine.
+        param (str): The name of the config param to retrieve.
 
-            return vm_name
+    Returns:
+        str: The value of the config param, or None if it could not be fetched.
+    """
+    param_url = f"{_VMS_URL}/{vm_id}/params/{param}"
+    try:
+        param_response = SESSION.get(param_url, timeout=REQUEST_TIMEOUT)
+        param_response.raise_for_status()
+        return _json(param_response).get("value", "Unknown")
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching config param {param} for {vm_id}: {e}")
+        return None
 
 
 def get_vm_info(vm_id):
     """
     Retrieves information about a specific virtual machine.
 
+    The config params are requested concurrently.
+
     Args:
         vm_id (str): The ID of the virtual machine to retrieve information for.
 
     Returns:
-        dict: A dictionary containing information about the virtual machine, including its name, working directory, and guest OS.
+        dict: A dictionary mapping each config param (guest OS, display name, working directory and detailed guest info) to its value.
     """
-    config_param = ["guestOS", "displayName", "workingDir", "guestInfo.detailed.data"]
-
-    for param in config_param:
-        MAX_OUTPUT_LENGTH = 120
-        ip_url = f"{BASE_URL}/api/vms/{vm_id}/params/{param}"
-        headers = {"Accept": "application/vnd.vmware.vmw.rest-v1+json"}
-        try:
-            param_response = requests.get(
-                ip_url, headers=headers, auth=HTTPBasicAuth(USERNAME, PASSWORD),
-                timeout=60
-            )
-            param_response.raise_for_status()
-            param_results = param_response.json()
-            print(
-                f"   {param.capitalize()} : {param_results.get('value', 'Unknown')[:MAX_OUTPUT_LENGTH]}"
-            )
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching config param {param} for {vm_id}: {e}")
+    with ThreadPoolExecutor(max_workers=len(_VM_INFO_PARAMS)) as executor:
+        values = executor.map(lambda param: _get_vm_param(vm_id, param), _VM_INFO_PARAMS)
+        return {param: value for param, value in zip(_VM_INFO_PARAMS, values) if value is not None}
 
 
 def get_vm_ip(vm_id):
@@ -168,79 +521,116 @@ def get_vm_ip(vm_id):
     Retrieves the IP address of the current guest operating system in the VMware REST server.
 
     Returns:
-        str: The IP address of the guest operating system.
+        str: The IP address of the guest operating system, or None if it could not be fetched.
     """
-    ip_url = f"{BASE_URL}/api/vms/{vm_id}/ip"
-    headers = {"Accept": "application/vnd.vmware.vmw.rest-v1+json"}
+    ip_url = f"{_VMS_URL}/{vm_id}/ip"
     try:
-        ip_response = requests.get(
-            ip_url, headers=headers, auth=HTTPBasicAuth(USERNAME, PASSWORD),
-            timeout=60
-        )
+        ip_response = SESSION.get(ip_url, timeout=REQUEST_TIMEOUT)
         ip_response.raise_for_status()
-        ip_address = ip_response.json().get("ip", "Unknown")
-        print(f"   IP Address: {ip_address}")
+        return _json(ip_response).get("ip", "Unknown")
     except requests.exceptions.RequestException as e:
         print(f"Error fetching IP address for VM {vm_id}: {e}")
+        return None
 
 
 def get_vm_mac(vm_id):
     """
-    Retrieves the MAC address of the current network interface in the VMware REST server.
+    Retrieves the MAC addresses of the network interfaces in the VMware REST server.
 
     Returns:
-        str: The MAC address of the network interface.
+        list: A list of (NIC index, MAC address) tuples.
     """
-    nic_url = f"{BASE_URL}/api/vms/{vm_id}/nic"
-    headers = {"Accept": "application/vnd.vmware.vmw.rest-v1+json"}
+    nic_url = f"{_VMS_URL}/{vm_id}/nic"
     try:
-        nic_response = requests.get(
-            nic_url, headers=headers, auth=HTTPBasicAuth(USERNAME, PASSWORD),
-            timeout=60
-        )
+        nic_response = SESSION.get(nic_url, timeout=REQUEST_TIMEOUT)
         nic_response.raise_for_status()
-        nics = nic_response.json().get("nics", [])
-        for nic in nics:
-            mac_address = nic.get("macAddress", "Unknown")
-            print(f"   MAC Address (NIC {nic.get('index', 'Unknown')}): {mac_address}")
+        nics = _json(nic_response).get("nics", [])
+        return [(nic.get("index", "Unknown"), nic.get("macAddress", "Unknown")) for nic in nics]
     except requests.exceptions.RequestException as e:
         print(f"Error fetching MAC address for VM {vm_id}: {e}")
+        return []
 
 
 def get_vm_setting(vm_id):
     """
-    Retrieves a specific setting for a virtual machine based on its ID and parameter name.
+    Retrieves the processor and memory settings for a virtual machine based on its ID.
 
     Args:
-        param (str): The name of the setting to retrieve.
+        vm_id (str): The ID of the virtual machine to retrieve its settings for.
 
     Returns:
-        str: The value of the specified setting.
+        tuple: The (processors, memory) settings, or None if they could not be fetched.
     """
-    settings_url = f"{BASE_URL}/api/vms/{vm_id}"
-    headers = {"Accept": "application/vnd.vmware.vmw.rest-v1+json"}
+    settings_url = f"{_VMS_URL}/{vm_id}"
     try:
-        settings_response = requests.get(
-            settings_url, headers=headers, auth=HTTPBasicAuth(USERNAME, PASSWORD),
-            timeout=60
-        )
+        settings_response = SESSION.get(settings_url, timeout=REQUEST_TIMEOUT)
         settings_response.raise_for_status()
-        settings = settings_response.json()
+        settings = _json(settings_response)
         processors = settings.get("cpu", {}).get("processors", "Unknown")
         memory = settings.get("memory", "Unknown")
-        print(f"   Processors: {processors}")
-        print(f"   Memory: {memory} MB")
+        return processors, memory
     except requests.exceptions.RequestException as e:
         print(f"Error fetching settings for VM {vm_id}: {e}")
+        return None
 
 
-def display_vms(vms, show_all_info=False):
+def _collect_vm_details(vms, show_all_info):
+    """
+    Fetches everything display_vms shows for a list of virtual machines.
+
+    All requests go through one thread pool: the power state (and config params if requested) of
+    every VM first, then the IP, NIC and settings of the VMs that turned out to be powered on.
+
+    Args:
+        vms (list): The virtual machines as returned by get_all_vms.
+        show_all_info (bool): If True, also fetches the config params get_vm_info returns.
+
+    Returns:
+        list: One dict per VM, in the same order, keyed by name, power_state, ip, macs, settings and info.
+    """
+    vm_ids = [vm.get("id") for vm in vms]
+    details = [{"name": _vm_name_from_path(vm.get("path"))} for vm in vms]
+
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, 4 * len(vms))) as executor:
+        power_futures = [executor.submit(get_vm_power_state, vm_id) for vm_id in vm_ids]
+        # The config params go straight into this pool rather than through get_vm_info's own pool.
+        info_futures = [
+            [executor.submit(_get_vm_param, vm_id, param) for param in _VM_INFO_PARAMS]
+            for vm_id in vm_ids
+        ] if show_all_info else []
+
+        guest_futures = {}
+        for i, (vm_id, power_future) in enumerate(zip(vm_ids, power_futures)):
+            details[i]["power_state"] = power_future.result()
+            if details[i]["power_state"] == "poweredOn":
+                guest_futures[i] = (
+                    executor.submit(get_vm_ip, vm_id),
+                    executor.submit(get_vm_mac, vm_id),
+                    executor.submit(get_vm_setting, vm_id),
+                )
+
+        for i, (ip_future, macs_future, settings_future) in guest_futures.items():
+            details[i]["ip"] = ip_future.result()
+            details[i]["macs"] = macs_future.result()
+            details[i]["settings"] = settings_future.result()
+
+        for i, param_futures in enumerate(info_futures):
+            values = (future.result() for future in param_futures)
+            details[i]["info"] = {
+                param: value for param, value in zip(_VM_INFO_PARAMS, values) if value is not None
+            }
+    return details
+
+
+def display_vms(vms, show_all_info=False, pause=False):
     """
     Retrieves and displays information about a list of virtual machines. Information displayed includes the machine's name, path, ID, power state, IP address (if applicable), MAC addresses for each network interface (if applicable), processors, memory usage, CPU cores, guest OS type, display name, working directory, current snapshot status, and any additional custom settings available in VMware.
     If all_info is True it will also retrieve information about the virtual machine's hardware configuration such as host bus adapter count and model (if applicable), network adapters connected to each interface for both Ethernet/LAN & Fibre Channel, connection status of various devices like CD-ROM drive(s)
+    The details of each VM are fetched concurrently and printed in the original order once all requests have completed.
     Args:
         vms (list): A list containing information about available virtual machines. Each entry is a dictionary with keys including 'id', 'path', and other VM-related info.
         show_all_info (bool): If True, displays more detailed hardware configuration of each VM in addition to the standard vm details displayed by default. Defaults to False.
+        pause (bool): If True, waits for the user to press Enter after the listing, so it is not pushed off screen straight away. Defaults to False.
     Returns:
         None
     """
@@ -248,25 +638,32 @@ def display_vms(vms, show_all_info=False):
         print("No VMs available.")
         return
 
-    for i, vm in enumerate(vms, start=1):
-        vm_id = vm.get("id")
-        vm_path = vm.get("path")
-        vm_name = get_vm_name_by_ids(vm_id)
-        print(f"\n{i}. VM Name: {vm_name}")
-        print(f"   VM Path: {vm_path}")
-        print(f"   VM ID: {vm_id}")
-
-        power_state = get_vm_power_state(vm_id)
-        print(f"   Power State: {power_state}")
-
-        if power_state == "poweredOn":
-            get_vm_ip(vm_id)
-            get_vm_mac(vm_id)
-            get_vm_setting(vm_id)
+    results = _collect_vm_details(vms, show_all_info)
+
+    lines = []
+    for i, (vm, details) in enumerate(zip(vms, results), start=1):
+        lines.append(f"\n{i}. VM Name: {details['name']}")
+        lines.append(f"   VM Path: {vm.get('path')}")
+        lines.append(f"   VM ID: {vm.get('id')}")
+        lines.append(f"   Power State: {details['power_state']}")
+
+        if details["power_state"] == "poweredOn":
+            if details["ip"] is not None:
+                lines.append(f"   IP Address: {details['ip']}")
+            for index, mac_address in details["macs"]:
+                lines.append(f"   MAC Address (NIC {index}): {mac_address}")
+            if details["settings"] is not None:
+                processors, memory = details["settings"]
+                lines.append(f"   Processors: {processors}")
+                lines.append(f"   Memory: {memory} MB")
 
         if show_all_info:
-            get_vm_info(vm_id)
-    time.sleep(3)
+            for param, value in details["info"].items():
+                lines.append(f"   {param.capitalize()} : {value[:MAX_OUTPUT_LENGTH]}")
+    sys.stdout.write("\n".join(lines) + "\n")
+
+    if pause:
+        input("Press Enter to continue...")
 
 
 def get_vm_power_state(vm_id):
@@ -277,167 +674,353 @@ def get_vm_power_state(vm_id):
         str: The power state of the guest operating system ("on" or "off").
     """
     try:
-        power_url = f"{BASE_URL}/api/vms/{vm_id}/power"
-        headers = {
-            "Accept": "application/vnd.vmware.vmw.rest-v1+json",
-            "Content-Type": "application/vnd.vmware.vmw.rest-v1+json",
-        }
-        power_response = requests.get(
-            power_url, headers=headers, auth=HTTPBasicAuth(USERNAME, PASSWORD),
-            timeout=60
-        )
+        power_url = f"{_VMS_URL}/{vm_id}/power"
+        power_response = SESSION.get(power_url, timeout=REQUEST_TIMEOUT)
         power_response.raise_for_status()
-        return power_response.json().get("power_state", "Unknown")
+        return _json(power_response).get("power_state", "Unknown")
     except requests.RequestException as e:
         print(f"Error fetching power state for VM {vm_id}: {e}")
         return "Unknown"
 
 
-def power_on_off(vm_id, action):
+def get_power_states(vm_ids):
+    """
+    Retrieves the power states of several virtual machines concurrently.
+
+    Args:
+        vm_ids (list): The IDs of the virtual machines.
+
+    Returns:
+        list: The power state of each virtual machine, in the same order as vm_ids.
+    """
+    if not vm_ids:
+        return []
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(vm_ids))) as executor:
+        return list(executor.map(get_vm_power_state, vm_ids))
+
+
+def _is_already_in_state(action, power_state):
+    """
+    Checks whether a power action would leave the virtual machine in the state it is already in.
+
+    Args:
+        action (str): The power action ("on" or "off").
+        power_state (str): The current power state, or None if it is not known.
+
+    Returns:
+        bool: True if the VM is already in the state the action leads to.
+    """
+    return power_state is not None and power_state == _TARGET_POWER_STATES.get(action)
+
+
+def power_on_off(vm_id, action, vms=None):
     """
     Powers on or off a virtual machine based on the specified action.
 
+    The power request is sent straight away. The current power state is only checked up front if the
+    caller already knows it, and otherwise only fetched to explain a rejected request.
+
     Args:
         vm_id (str): The ID of the virtual machine to power.
         action (str): The action to perform ("on" or "off").
+        vms (list): An already fetched list of virtual machines used to resolve the VM name. If its entries carry a 'power_state' (see show_all_vm_ids), that state is checked before sending the request. Without it, the name comes from a cached listing if there is one, and only the ID is shown otherwise.
 
     Returns:
-        bool: True if the action was successful, False otherwise.
+        bool: False if the VM was already in the requested state, None otherwise.
     """
-    url = f"{BASE_URL}/api/vms/{vm_id}/power"
-    headers = {
-        "Accept": "application/vnd.vmware.vmw.rest-v1+json",
-        "Content-Type": "application/vnd.vmware.vmw.rest-v1+json",
-    }
+    url = f"{_VMS_URL}/{vm_id}/power"
     payload = action
-    vm_name = get_vm_name_by_ids(vm_id)
+    known_states = {vm.get("id"): vm.get("power_state") for vm in vms or []}
 
-    if action == "on" and get_vm_power_state(vm_id) == "poweredOn":
-        print(f"VM {vm_name} {vm_id} is Already Powered On!")
-        return False
+    # The name is only a label, so never fetch the VM list just for it.
+    vm_paths = {vm.get("id"): vm.get("path") for vm in vms} if vms is not None else _vm_cache.get("paths", {})
+    vm_name = _vm_name_from_path(vm_paths.get(vm_id))
+    label = f"{vm_name} {vm_id}" if vm_name else vm_id
 
-    if action == "off" and get_vm_power_state(vm_id) == "poweredOff":
-        print(f"VM {vm_name} {vm_id} is Already Powered Off!")
+    if _is_already_in_state(action, known_states.get(vm_id)):
+        print(f"VM {label} is Already Powered {action.capitalize()}!")
         return False
 
     try:
-        response = requests.put(
-            url, headers=headers, data=payload, auth=HTTPBasicAuth(USERNAME, PASSWORD),
-            timeout=60
-        )
+        response = SESSION.put(url, headers=_JSON_HEADERS, data=payload, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
-        power_state = response.json().get("power_state", "Unknown")
-        # vm_name = get_vm_name_by_ids(vm_id)
-        print(f"VM {vm_name} {vm_id} is now {power_state}.")
+        get_all_vms.cache_clear()
+        power_state = _json(response).get("power_state", "Unknown")
+        print(f"VM {label} is now {power_state}.")
     except requests.exceptions.RequestException as e:
+        # The server may have rejected the request because there was nothing to change.
+        if _is_already_in_state(action, get_vm_power_state(vm_id)):
+            print(f"VM {label} is Already Powered {action.capitalize()}!")
+            return False
         print(f"Error changing power state for VM {vm_id}: {e}")
 
 
-def get_all_networks():
+def _uncached_get_all_networks():
     """
     Retrieves a list of all network interfaces available in the VMware REST server.
 
     Returns:
         dict: A dictionary containing information about each network interface, including its ID and name.
     """
-    network_url = f"{BASE_URL}/api/vmnet"
-    headers = {"Accept": "application/vnd.vmware.vmw.rest-v1+json"}
     try:
-        response = requests.get(
-            network_url, headers=headers, auth=HTTPBasicAuth(USERNAME, PASSWORD),
-            timeout=60
-        )
+        response = SESSION.get(_NETS_URL, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
-        return response.json().get("vmnets", [])
+        return _json(response).get("vmnets", [])
     except requests.exceptions.RequestException as e:
         print(f"Error fetching networks: {e}")
         return []
 
 
+def get_all_networks(ttl=NET_CACHE_TTL):
+    """
+    Retrieves a list of all network interfaces, reusing the last result if it is younger than the TTL.
+
+    A result saved on disk by an earlier run is reused too while it is younger than the TTL. Failed or
+    empty results are not cached. Call get_all_networks.cache_clear() to force a fresh request.
+
+    Args:
+        ttl (float): Maximum age in seconds of a cached result. Defaults to NET_CACHE_TTL.
+
+    Returns:
+        dict: A dictionary containing information about each network interface, including its ID and name.
+    """
+    now = time.monotonic()
+    cached_at, networks = _net_cache.get("networks", (0.0, None))
+    if networks is not None and now - cached_at < ttl:
+        return networks
+
+    saved = _read_disk_cache("networks", ttl)
+    if saved is not None:
+        age, networks = saved
+        cached_at = now - age
+    else:
+        networks = _uncached_get_all_networks()
+        cached_at = now
+        if networks:
+            _write_disk_cache("networks", networks)
+    if networks:
+        _net_cache["networks"] = (cached_at, networks)
+    return networks
+
+
+def _clear_net_cache():
+    """
+    Drops the cached network list, both in memory and on disk. Exposed as get_all_networks.cache_clear().
+    """
+    _net_cache.clear()
+    _remove_disk_cache("networks")
+
+
+get_all_networks.cache_clear = _clear_net_cache
+
+
+def _clear_caches():
+    """
+    Drops the cached VM and network lists, e.g. after the REST server was started or stopped.
+    """
+    get_all_vms.cache_clear()
+    get_all_networks.cache_clear()
+
+
 def display_networks(networks):
     if not networks:
         print("No networks available.")
         return
 
+    lines = []
     for i, net in enumerate(networks, start=1):
-        print(f"\n{i}. Network Name: {net.get('name', 'Unknown')}")
-        print(f"   Type: {net.get('type', 'Unknown')}")
-        print(f"   DHCP: {net.get('dhcp', 'Unknown')}")
-        print(f"   Subnet: {net.get('subnet', 'Unknown')}")
-        print(f"   Mask: {net.get('mask', 'Unknown')}")
+        lines.append(f"\n{i}. Network Name: {net.get('name', 'Unknown')}")
+        lines.append(f"   Type: {net.get('type', 'Unknown')}")
+        lines.append(f"   DHCP: {net.get('dhcp', 'Unknown')}")
+        lines.append(f"   Subnet: {net.get('subnet', 'Unknown')}")
+        lines.append(f"   Mask: {net.get('mask', 'Unknown')}")
+    sys.stdout.write("\n".join(lines) + "\n")
+
+
+MENU_TEXT = """
+Menu:
+1. Show All VMs
+2. Show Power State for VM by ID
+3. Power On VM by ID
+4. Power Off VM by ID
+5. Show All Networks
+6. Start VMware REST Server
+7. Stop VMware REST Server
+8. Configure VMare REST Server Username & Password
+q. Quit
+"""
+
+
+def _prompt_vm_id(prompt):
+    """
+    Lists every VM with its power state and asks the user to pick one.
+
+    Args:
+        prompt (str): The input prompt shown to the user.
+
+    Returns:
+        tuple: The entered VM ID and the listed VMs (see show_all_vm_ids).
+    """
+    vms = show_all_vm_ids(with_power_state=True)
+    print()
+    vm_id = input(prompt).strip()
+    print()
+    return vm_id, vms
+
+
+def _menu_show_vms():
+    """
+    Menu option 1: show every VM with its details.
+    """
+    vms = get_all_vms()
+    if vms:
+        display_vms(vms, pause=True)
+    else:
+        print("No VMs found or error retrieving VMs.")
+
+
+def _menu_show_power_state():
+    """
+    Menu option 2: show the power state of a VM chosen by the user.
+    """
+    vm_id, vms = _prompt_vm_id("Enter VM ID: ")
+    known_states = {vm.get("id"): vm["power_state"] for vm in vms}
+    power_state = known_states.get(vm_id) or get_vm_power_state(vm_id)
+    vm_name = get_vm_name_by_ids(vm_id, vms=vms)
+    print(f"Power state of {vm_name} VM {vm_id}: {power_state}")
+
+
+def _menu_power_on():
+    """
+    Menu option 3: power on a VM chosen by the user.
+    """
+    vm_id, vms = _prompt_vm_id("Enter VM ID to power on: ")
+    power_on_off(vm_id, "on", vms=vms)
+    print()
+
+
+def _menu_power_off():
+    """
+    Menu option 4: power off a VM chosen by the user.
+    """
+    vm_id, vms = _prompt_vm_id("Enter VM ID to power off: ")
+    power_on_off(vm_id, "off", vms=vms)
+    print()
+
+
+def _menu_show_networks():
+    """
+    Menu option 5: show every virtual network.
+    """
+    display_networks(get_all_networks())
+
+
+def _menu_start_server(vmware_server):
+    """
+    Menu option 6: start the VMware REST server.
+    """
+    _start_server(vmware_server)
+    _clear_caches()
+
+
+def _menu_stop_server(vmware_server):
+    """
+    Menu option 7: stop the VMware REST server.
+    """
+    vmware_server.stop_server()
+    _clear_caches()
+
+
+def _menu_configure(vmware_server):
+    """
+    Menu option 8: configure the VMware REST server and write vmworkstation.toml, then switch to the new settings.
+    """
+    vmware_server.configure_vmware_server()
+    configure_vmworkstation_ini()
+    vmware_server.BASE_URL = BASE_URL
+    vmware_server.VMWARE_REST_EXE = VMWARE_REST_EXE
+    vmware_server.invalidate_exe_cache()
+
+
+# Handler for each MENU_TEXT choice that only talks to the REST API.
+_MENU_HANDLERS = {
+    "1": _menu_show_vms,
+    "2": _menu_show_power_state,
+    "3": _menu_power_on,
+    "4": _menu_power_off,
+    "5": _menu_show_networks,
+}
+
+# Handler for each MENU_TEXT choice that manages the server; these take the VMWareServer.
+_SERVER_MENU_HANDLERS = {
+    "6": _menu_start_server,
+    "7": _menu_stop_server,
+    "8": _menu_configure,
+}
 
 
 def menu(vmware_server):
     while True:
-        print("\nMenu:")
-        print("1. Show All VMs")
-        print("2. Show Power State for VM by ID")
-        print("3. Power On VM by ID")
-        print("4. Power Off VM by ID")
-        print("5. Show All Networks")
-        print("6. Start VMware REST Server")
-        print("7. Stop VMware REST Server")
-        print("8. Configure VMare REST Server Username & Password")
-        print("q. Quit")
+        sys.stdout.write(MENU_TEXT)
 
         choice = input("Enter your choice: ").strip().lower()
 
-        if choice == "1":
-            vms = get_all_vms()
-            if vms:
-                display_vms(vms)
-            else:
-                print("No VMs found or error retrieving VMs.")
-
-        elif choice == "2":
-            show_all_vm_ids()
-            print()
-            vm_id = input("Enter VM ID: ").strip()
-            print()
-            power_state = get_vm_power_state(vm_id)
-            vm_name = get_vm_name_by_ids(vm_id)
-            print(f"Power state of {vm_name} VM {vm_id}: {power_state}")
-
-        elif choice == "3":
-            show_all_vm_ids()
-            print()
-            vm_id = input("Enter VM ID to power on: ").strip()
-            print()
-            power_on_off(vm_id, "on")
-            print()
-
-        elif choice == "4":
-            show_all_vm_ids()
-            print()
-            vm_id = input("Enter VM ID to power off: ").strip()
-            print()
-            power_on_off(vm_id, "off")
-            print()
-
-        elif choice == "5":
-            networks = get_all_networks()
-            display_networks(networks)
-
-        elif choice == "6":
-            vmware_server.start_server()
-
-        elif choice == "7":
-            vmware_server.stop_server()
-            
-        elif choice == "8":
-            vmware_server.configure_vmware_server()
-            configure_vmworkstation_ini()
-
-
-        elif choice in ["q", "Q"]:
+        if choice == "q":
             print("Exiting program.")
             break
 
+        if choice in _MENU_HANDLERS:
+            _MENU_HANDLERS[choice]()
+        elif choice in _SERVER_MENU_HANDLERS:
+            _SERVER_MENU_HANDLERS[choice](vmware_server)
         else:
             print("Invalid choice, please try again.")
 
 
+def _start_server(vmware_server):
+    """
+    Starts the VMware REST server, printing the error if it cannot be launched.
+
+    Args:
+        vmware_server (VMWareServer): The server to start.
+
+    Returns:
+        bool: True if the server was started, False if it did not come up, None if it could not be launched.
+    """
+    from vmware_server import VMRestStartError
+
+    try:
+        return vmware_server.start_server()
+    except VMRestStartError as e:
+        print(f"Error: {e}")
+        return None
+
+
+def _start_server_or_exit(vmware_server):
+    """
+    Starts the VMware REST server for a command line option, exiting with status 1 if it cannot be launched.
+
+    Args:
+        vmware_server (VMWareServer): The server to start.
+
+    Returns:
+        bool: True if the server was started, False otherwise.
+    """
+    started = _start_server(vmware_server)
+    if started is None:
+        sys.exit(1)
+    return started
+
+
 def main():
+    import argparse
+    import logging
+
+    from vmware_server import VMWareServer
+
+    # Logging is configured by the script, not by the modules it imports.
+    logging.basicConfig(level=logging.INFO)
+
     parser = argparse.ArgumentParser(description="VMware Workstation REST Interface")
 
     parser.add_argument("--show-vms", action="store_true", help="Show all VMs and quit")
@@ -479,13 +1062,26 @@ def main():
         help="Stop the VMware REST server after running a command",
     )
     parser.add_argument(
-        "--configure", action="store_true", help="Configure vmworkstation.ini file"
+        "--configure", action="store_true", help="Configure vmworkstation.toml file"
     )
 
     args = parser.parse_args()
 
     vmware_server = VMWareServer(BASE_URL, VMWARE_REST_EXE)
+    try:
+        _run(args, vmware_server)
+    finally:
+        vmware_server.close()
+
 
+def _run(args, vmware_server):
+    """
+    Runs the command line option given, or the interactive menu when there is none.
+
+    Args:
+        args (argparse.Namespace): The parsed command line arguments.
+        vmware_server (VMWareServer): The server used to start and stop vmrest.
+    """
     if args.configure:
         configure_vmworkstation_ini()
         sys.exit(0)
@@ -493,16 +1089,18 @@ def main():
     display_title_bar()
 
     if args.start_server:
-        vmware_server.start_server()
+        _start_server_or_exit(vmware_server)
+        _clear_caches()
         sys.exit(0)
 
     if args.stop_server:
         vmware_server.stop_server()
+        _clear_caches()
         sys.exit(0)
 
     if args.show_vms:
         if args.go_live:
-            vmware_server.start_server()
+            _start_server_or_exit(vmware_server)
         vms = get_all_vms()
         display_vms(vms, show_all_info=True)
         if args.go_off:
@@ -511,7 +1109,7 @@ def main():
 
     if args.show_vms_ids:
         if args.go_live:
-            vmware_server.start_server()
+            _start_server_or_exit(vmware_server)
         vms = show_all_vm_ids()
         display_vms(vms, show_all_info=True)
         if args.go_off:
@@ -525,7 +1123,7 @@ def main():
 
     if args.power_on:
         if args.go_live:
-            vmware_server.start_server()
+            _start_server_or_exit(vmware_server)
 
         power_on_off(args.power_on, "on")
 
@@ -535,7 +1133,7 @@ def main():
 
     if args.power_off:
         if args.go_live:
-            vmware_server.start_server()
+            _start_server_or_exit(vmware_server)
 
         power_on_off(args.power_off, "off")
 
@@ -8,12 +8,106 @@ import subprocess
 import logging
 import sys
 import os
-import platform
+import select
+import tempfile
 import time
 import psutil
 import requests
+from requests.adapters import HTTPAdapter
 
-logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_IS_WINDOWS = sys.platform == "win32"
+# Linux exposes each process name as /proc/<pid>/comm, which is much cheaper to read than
+# building a psutil.Process for every PID.
+_HAS_PROC_COMM = sys.platform.startswith("linux")
+
+
+def _is_named(process_name, name) -> bool:
+    """
+    Compare process names the way Windows does, ignoring case ('vmrest.exe' and 'VMREST.EXE' match).
+
+    Args:
+        process_name (str): The name reported for a process. May be None if it could not be read.
+        name (str): The name looked for.
+
+    Returns:
+        bool: True if the names match.
+    """
+    return process_name is not None and process_name.lower() == name.lower()
+
+
+def _processes_named(name):
+    """
+    Yield the running processes with the given name, ignoring case.
+
+    Args:
+        name (str): The process name to look for, e.g. "vmrest".
+
+    Yields:
+        psutil.Process: A process with that name.
+    """
+    if not _HAS_PROC_COMM:
+        for proc in psutil.process_iter(attrs=["name"]):
+            if _is_named(proc.info["name"], name):
+                yield proc
+        return
+
+    # The kernel truncates comm to 15 characters.
+    comm_name = name.lower().encode()[:15] + b"\n"
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry.name}/comm", "rb") as comm:
+                if comm.read().lower() != comm_name:
+                    continue
+            yield psutil.Process(int(entry.name))
+        except (OSError, psutil.Error):
+            continue  # The process exited while scanning
+
+
+class VMRestStartError(RuntimeError):
+    """
+    Raised when the VMware Workstation REST server cannot be launched at all.
+    """
+
+
+def _wait_for_exit(proc, timeout) -> bool:
+    """
+    Wait for a process to exit.
+
+    On Linux this is a single poll on a pidfd, which the kernel wakes when the process exits, instead
+    of psutil's sleep-and-check loop. Elsewhere, or on kernels without pidfd support, psutil's wait()
+    is used; on Windows that already blocks in WaitForSingleObject.
+
+    Args:
+        proc (psutil.Process): The process to wait for.
+        timeout (float): Seconds to wait at most.
+
+    Returns:
+        bool: True if the process exited, False if it was still running when the timeout expired.
+    """
+    pidfd_open = getattr(os, "pidfd_open", None)
+    if pidfd_open is not None:
+        try:
+            fd = pidfd_open(proc.pid)
+        except ProcessLookupError:
+            return True  # Already gone
+        except OSError:
+            pass  # No pidfd support in this kernel
+        else:
+            try:
+                poller = select.poll()
+                poller.register(fd, select.POLLIN)
+                return bool(poller.poll(timeout * 1000))
+            finally:
+                os.close(fd)
+    try:
+        proc.wait(timeout=timeout)
+        return True
+    except psutil.TimeoutExpired:
+        return False
 
 
 class VMWareServer:
@@ -35,13 +129,57 @@ class VMWareServer:
     """
     RUNNING = "running"
     STOPPED = "stopped"
+    REST_PROBE_TIMEOUT = 0.1
+    # How long start_server waits for the REST API to answer, and the backoff between probes.
+    START_TIMEOUT = 10
+    READY_PROBE_TIMEOUT = 0.5
+    READY_POLL_INITIAL = 0.01
+    READY_POLL_MAX = 0.25
+    # Seconds stop_server waits for vmrest to exit after asking it to, before killing it.
+    STOP_TIMEOUT = 5
+    # Where start_server records the PID of the vmrest process it launched.
+    PID_FILE = os.path.join(tempfile.gettempdir(), "vmrest.pid")
 
     def __init__(self, base_url, VMWARE_REST_EXE):
         self.VMWARE_REST_EXE = VMWARE_REST_EXE
-        self.VMWARE_REST_PROCESS = "vmrest.exe"
+        # The name the running executable shows up under in the process list.
+        self.VMWARE_REST_PROCESS = "vmrest.exe" if _IS_WINDOWS else "vmrest"
         self.BASE_URL = base_url
+        # Probes run one at a time, so a single kept-alive connection is all they need. close() releases it.
+        self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        # PID of the last vmrest process seen, checked before scanning every process.
+        self._pid = None
+        # The vmrest process launched by start_server, if any.
+        self.process = None
+        # Whether VMWARE_REST_EXE exists, looked up on first use (see invalidate_exe_cache).
+        self._exe_found = None
         self.state = self.STOPPED if not self.is_server_running() else self.RUNNING
 
+    def _exe_exists(self) -> bool:
+        """
+        Check whether the VMware Workstation REST executable exists, remembering the answer.
+
+        Returns:
+            bool: True if VMWARE_REST_EXE exists, False otherwise.
+        """
+        if self._exe_found is None:
+            self._exe_found = os.path.exists(self.VMWARE_REST_EXE)
+        return self._exe_found
+
+    def invalidate_exe_cache(self) -> None:
+        """
+        Forget whether the executable exists, e.g. after VMware Workstation was installed or moved.
+        """
+        self._exe_found = None
+
+    def close(self) -> None:
+        """
+        Close the connection kept open for REST probes.
+        """
+        self._session.close()
+
     def configure_vmware_server(self):
         """
         Configure the VMware Workstation REST server.
@@ -52,7 +190,7 @@ class VMWareServer:
         Returns:
             bool: True if the server was successfully configured, False otherwise.
         """
-        if not os.path.exists(self.VMWARE_REST_EXE):
+        if not self._exe_exists():
             print(f"Error: Server executable not found: {self.VMWARE_REST_EXE}.")
             return False
         try:
@@ -69,53 +207,131 @@ class VMWareServer:
         """
         Check if the VMware Workstation REST server is running.
 
-        This method checks the current state of the server and returns True if it's running, False otherwise.
+        A quick REST probe is tried first since it is much cheaper than enumerating every process
+        on the system. The process list is only scanned when the probe gets no answer, which also
+        covers a server that is running but hung.
+
+        Args:
+            check_rest (bool): If True, wait up to 5 seconds for the REST probe instead of 100ms and
+                report why it failed.
 
         Returns:
             bool: True if the server is running, False otherwise.
         """      
-        # Check if the process is running
-        logging.info("Checking VMware Workstation REST server Power State.")
-        for proc in psutil.process_iter(["name"]):
-            if proc.info["name"] == self.VMWARE_REST_PROCESS:
-                self.state = self.RUNNING
-                return True
-        # Optionally check if the REST API is reachable
-        if check_rest:
-            try:
-                response = requests.get(self.BASE_URL, timeout=5)
-                if response.status_code == 200:
-                    self.state = self.RUNNING
-                    return True
+        logger.info("Checking VMware Workstation REST server Power State.")
+        # Check if the REST API is reachable, then fall back to checking if the process is running
+        timeout = 5 if check_rest else self.REST_PROBE_TIMEOUT
+        running = self._rest_answers(timeout, report_errors=check_rest) or self._find_process() is not None
 
-            except requests.exceptions.ConnectionError as e:
-                print(f"Error checking server using REST: {e}")
+        self.state = self.RUNNING if running else self.STOPPED
+        return running
 
-        self.state = self.STOPPED
-        return False
+    def _find_process(self):
+        """
+        Find the running vmrest process.
+
+        The last PID seen is checked first, so the full process scan only runs when that process is gone.
+
+        Returns:
+            psutil.Process: The vmrest process, or None if it is not running.
+        """
+        if self._pid is not None:
+            if not self._reap_child(self._pid):
+                try:
+                    proc = psutil.Process(self._pid)
+                    if _is_named(proc.name(), self.VMWARE_REST_PROCESS):
+                        return proc
+                except psutil.Error:
+                    pass
+            self._pid = None
+
+        # Stop at the first match
+        proc = next(_processes_named(self.VMWARE_REST_PROCESS), None)
+        if proc is not None:
+            self._pid = proc.pid
+        return proc
+
+    def _reap_child(self, pid) -> bool:
+        """
+        Collect the exit status of the vmrest process launched by start_server, if pid is that process.
+
+        An exited child stays in the process table as a zombie, still named vmrest, until it is reaped.
+
+        Args:
+            pid (int): The PID to check.
+
+        Returns:
+            bool: True if pid is the launched vmrest process and it has exited, False otherwise.
+        """
+        return self.process is not None and self.process.pid == pid and self.process.poll() is not None
+
+    def _rest_answers(self, timeout, report_errors=False) -> bool:
+        """
+        Probe the REST API once.
+
+        Args:
+            timeout (float): Seconds to wait for an answer.
+            report_errors (bool): If True, log why the probe failed as an error instead of at debug level.
+
+        Returns:
+            bool: True if the REST API answered without a server error, False otherwise.
+        """
+        try:
+            # Only the status line matters. Any answer below 500 (vmrest may well reply 401 or 405 to
+            # an unauthenticated HEAD) proves the listener is up.
+            response = self._session.head(self.BASE_URL, timeout=timeout, allow_redirects=False)
+            return response.status_code < 500
+        except requests.exceptions.RequestException as e:
+            # Failed probes are expected while polling, so only log them as errors when asked to.
+            logger.log(logging.ERROR if report_errors else logging.DEBUG, "Error checking server using REST: %s", e)
+            return False
+
+    def wait_until_ready(self, timeout=None) -> bool:
+        """
+        Wait for the REST API to answer, polling with exponential backoff.
+
+        Args:
+            timeout (float): Seconds to wait at most. Defaults to START_TIMEOUT.
+
+        Returns:
+            bool: True as soon as the REST API answers, False if it did not before the deadline.
+        """
+        deadline = time.monotonic() + (self.START_TIMEOUT if timeout is None else timeout)
+        delay = self.READY_POLL_INITIAL
+        while not self._rest_answers(self.READY_PROBE_TIMEOUT):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, self.READY_POLL_MAX)
+        return True
 
     def start_server(self) -> bool:
         """
         Starts the VMware Workstation REST server.
 
-        This method checks if the server executable exists in the specified location. If it does, the server is started with the -C option.
-        If the executable does not exist or an error occurs during startup, an error message is printed and False is returned.
+        Nothing is launched if the server is already running. Otherwise the executable is started in the
+        background and this method returns as soon as the REST API answers. A missing executable or a
+        server that never comes up is reported with a printed message and False.
 
         Returns:
-        bool: True if the server was successfully started, False otherwise.
+        bool: True if the server is running, False otherwise.
+
+        Raises:
+        VMRestStartError: If the executable could not be launched because it disappeared after the existence check.
         """
         if self.state == self.RUNNING:
             print("VMware Workstation REST server is already running.")
             return True
 
-        if not os.path.exists(self.VMWARE_REST_EXE):
+        if not self._exe_exists():
             print(f"Error: Server executable not found: {self.VMWARE_REST_EXE}.")
             return False
 
         try:
-            logging.info("Starting VMware Workstation REST server.")
+            logger.info("Starting VMware Workstation REST server.")
             
-            if platform.system() == "Windows":
+            if _IS_WINDOWS:
                 # Start the server in a new process group to allow for termination
                 self.process = subprocess.Popen(
                     [self.VMWARE_REST_EXE],
@@ -124,15 +340,16 @@ class VMWareServer:
                     creationflags=subprocess.CREATE_NEW_PROCESS_GROUP,
                 )
             else:
-                subprocess.Popen(
+                self.process = subprocess.Popen(
                     [self.VMWARE_REST_EXE],
                     stdout=subprocess.DEVNULL,
                     stderr=subprocess.DEVNULL,
                     preexec_fn=os.setpgrp,
                 )
-            time.sleep(3)  # Allow the server time to start
-
-            if self.is_server_running(check_rest=True):
+            self._pid = self.process.pid
+            self._record_pid(self._pid)
+            # Return as soon as the REST API answers; only fall back to the process list if it never does.
+            if self.wait_until_ready() or self.is_server_running():
                 print("VMware Workstation REST server started successfully.")
                 self.state = self.RUNNING
                 return True
@@ -141,12 +358,87 @@ class VMWareServer:
                 return False
 
         except FileNotFoundError:
-            print(f"Error: Server executable not found: {self.VMWARE_REST_EXE}.")
-            sys.exit(1)
+            self.invalidate_exe_cache()
+            raise VMRestStartError(f"Server executable not found: {self.VMWARE_REST_EXE}.") from None
         except subprocess.SubprocessError as e:
             print(f"Error starting server: {e}")
             return False
 
+    def _record_pid(self, pid) -> None:
+        """
+        Remember the PID of a launched vmrest process so stop_server can find it without a process scan.
+
+        Args:
+            pid (int): The PID of the vmrest process.
+        """
+        try:
+            with open(self.PID_FILE, "w") as pid_file:
+                pid_file.write(str(pid))
+        except OSError as e:
+            logger.warning("Could not record vmrest PID: %s", e)
+
+    def _forget_pid(self) -> None:
+        """
+        Remove the recorded PID, if any.
+        """
+        try:
+            os.remove(self.PID_FILE)
+        except OSError:
+            pass
+
+    def _recorded_process(self):
+        """
+        Look up the vmrest process recorded by start_server.
+
+        A recorded PID that no longer exists, or now belongs to another program, is discarded.
+
+        Returns:
+            psutil.Process: The vmrest process, or None if there is no usable recorded PID.
+        """
+        try:
+            with open(self.PID_FILE) as pid_file:
+                proc = psutil.Process(int(pid_file.read()))
+            if _is_named(proc.name(), self.VMWARE_REST_PROCESS):
+                return proc
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, psutil.Error):
+            pass
+        self._forget_pid()
+        return None
+
+    def _stop_candidates(self):
+        """
+        Yield the vmrest processes stop_server should try, the one recorded by start_server first.
+
+        The full process scan only starts if the recorded process is missing or did not stop the server.
+
+        Yields:
+            psutil.Process: A vmrest process.
+        """
+        recorded = self._recorded_process()
+        if recorded is not None:
+            yield recorded
+        for proc in _processes_named(self.VMWARE_REST_PROCESS):
+            if recorded is None or proc.pid != recorded.pid:
+                yield proc
+
+    def _terminate(self, proc) -> None:
+        """
+        Terminate a process, killing it if it has not exited within STOP_TIMEOUT.
+
+        Args:
+            proc (psutil.Process): The process to stop.
+
+        Raises:
+            psutil.Error: If the process cannot be signalled, e.g. it belongs to another user.
+        """
+        proc.terminate()
+        if not _wait_for_exit(proc, self.STOP_TIMEOUT):
+            proc.kill()
+            _wait_for_exit(proc, self.STOP_TIMEOUT)
+        self._reap_child(proc.pid)
+
     def stop_server(self) -> bool:
         """
         Stop the VMware Workstation REST server.
@@ -161,20 +453,21 @@ class VMWareServer:
             print("VMware Workstation REST server is not running.")
             return True
 
-        logging.info("Stopping VMware Workstation REST server.")
-        for proc in psutil.process_iter(["pid", "name"]):
-            if proc.info["name"] == self.VMWARE_REST_PROCESS:
-                print(
-                    f"Terminating process {proc.info['name']} (PID {proc.info['pid']})..."
-                )
-                proc.terminate()
-                proc.wait()  # Wait for process to terminate
-                time.sleep(3)  # Allow time for the termination
-
-                if not self.is_server_running():
-                    print("VMware Workstation REST server stopped successfully.")
-                    self.state = self.STOPPED
-                    return True
+        logger.info("Stopping VMware Workstation REST server.")
+        for proc in self._stop_candidates():
+            logger.info("Terminating process %s (PID %s)...", self.VMWARE_REST_PROCESS, proc.pid)
+            try:
+                self._terminate(proc)
+            except psutil.Error as e:
+                logger.warning("Could not terminate process %s: %s", proc.pid, e)
+                continue
+
+            if not self.is_server_running():
+                self._forget_pid()
+                self._pid = None
+                print("VMware Workstation REST server stopped successfully.")
+                self.state = self.STOPPED
+                return True
         print(f"No running process found for {self.VMWARE_REST_PROCESS}.")
         return False
     
\ No newline at end of file